@@ -1,2 +1,2 @@
 # Package version
-__version__ = "0.16.37"
\ No newline at end of file
+__version__ = "0.16.38"
\ No newline at end of file
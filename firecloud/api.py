@@ -23,6 +23,9 @@ from six import string_types
 
 import inspect
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 import google.auth
 from google.auth.exceptions import DefaultCredentialsError, RefreshError
 from google.auth.transport.requests import AuthorizedSession, Request
@@ -38,12 +41,33 @@ FISS_USER_AGENT = "FISS/" + __version__
 __SESSION = None
 __USER_ID = None
 
+# Connections kept open by the session, so concurrent callers (e.g. the
+# supervisor) each reuse a connection rather than opening a new one
+SESSION_POOL_SIZE = 32
+
 # Suppress warnings about project ID
 logging.getLogger('google.auth').setLevel(logging.ERROR)
 
 #################################################
 # Utilities
 #################################################
+def _new_session():
+    """ Return an AuthorizedSession with a connection pool sized for
+    concurrent use, which retries idempotent requests on transient errors """
+    session = AuthorizedSession(google.auth.default(['https://www.googleapis.com/auth/userinfo.profile',
+                                                     'https://www.googleapis.com/auth/userinfo.email'])[0])
+    # POST is not retried, so e.g. a submission is never created twice; once
+    # retries run out, the final response is returned rather than raised
+    retries = Retry(total=3, backoff_factor=0.3,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=SESSION_POOL_SIZE,
+                          pool_maxsize=SESSION_POOL_SIZE,
+                          max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 def _set_session():
     """ Sets global __SESSION and __USER_ID if they haven't been set """
     global __SESSION
@@ -57,8 +81,7 @@ def _set_session():
             argspec = inspect.getargspec(id_token.verify_oauth2_token)
             
         try:
-            __SESSION = AuthorizedSession(google.auth.default(['https://www.googleapis.com/auth/userinfo.profile',
-                                                               'https://www.googleapis.com/auth/userinfo.email'])[0])
+            __SESSION = _new_session()
             health()
             # google.auth 2.1.0 introduced a restrictive clock skew that was unmodifiable until 2.3.2
             if 'clock_skew_in_seconds' in argspec.args:
@@ -77,8 +100,7 @@ def _set_session():
             try:
                 subprocess.check_call(['gcloud', 'auth', 'application-default',
                                        'login', '--no-launch-browser'])
-                __SESSION = AuthorizedSession(google.auth.default(['https://www.googleapis.com/auth/userinfo.profile',
-                                                                   'https://www.googleapis.com/auth/userinfo.email'])[0])
+                __SESSION = _new_session()
             except subprocess.CalledProcessError as cpe:
                 if cpe.returncode < 0:
                     logging.exception("%s was terminated by signal %d",
@@ -31,6 +31,29 @@ try:
 except ImportError:
     from collections import Iterable
 
+try:
+    from functools import lru_cache
+except ImportError:
+    # Python 2 has no lru_cache; this stand-in simply empties the cache when
+    # it fills, rather than evicting the least recently used entry
+    from functools import wraps
+
+    def lru_cache(maxsize=128):
+        def decorator(func):
+            cache = dict()
+
+            @wraps(func)
+            def wrapper(*args):
+                if args not in cache:
+                    if len(cache) >= maxsize:
+                        cache.clear()
+                    cache[args] = func(*args)
+                return cache[args]
+
+            wrapper.cache_clear = cache.clear
+            return wrapper
+        return decorator
+
 class attrdict(dict):
     """ dict whose members can be accessed as attributes, and default value is
     transparently returned for undefined keys; this yields more natural syntax
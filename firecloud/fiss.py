@@ -24,6 +24,7 @@ from six.moves import input
 from google.cloud import storage
 from firecloud import api as fapi
 from firecloud import fccore
+from firecloud.fccore import lru_cache
 from firecloud.errors import *
 from firecloud.__about__ import __version__
 from firecloud import supervisor
@@ -2162,16 +2163,15 @@ def printToCLI(value):
 # Main entrypoints
 #################################################
 
-def main(argv=None):
-    # Use this entry point to call high level api and have objects returned,
-    # (see firecloud/tests/highlevel_tests.py:call_func for usage examples)
-    if not argv:
-        argv = sys.argv
-
-    proj_required = not bool(fcconfig.project)
-    meth_ns_required = not bool(fcconfig.method_ns)
-    workspace_required = not bool(fcconfig.workspace)
-    etype_required = not bool(fcconfig.entity_type)
+@lru_cache(maxsize=1)
+def _build_parser(project, method_ns, workspace, entity_type, root_url):
+    # Building the full set of subcommand parsers is costly, and they only
+    # depend on these configuration values, so reuse them between calls
+    # to main() for as long as the values stay the same
+    proj_required = not bool(project)
+    meth_ns_required = not bool(method_ns)
+    workspace_required = not bool(workspace)
+    etype_required = not bool(entity_type)
     etype_choices = ['participant', 'participant_set', 'sample', 'sample_set',
                      'pair', 'pair_set']
 
@@ -2184,7 +2184,7 @@ def main(argv=None):
                                      usage=usage, epilog=epilog)
     # Core Flags
     parser.add_argument('-u', '--url', dest='api_url', default=None,
-            help='Firecloud API root URL [default: %s]' % fcconfig.root_url)
+            help='Firecloud API root URL [default: %s]' % root_url)
     
     parser.add_argument('-c', '--credentials', default=None,
                         help='Firecloud credentials file')
@@ -2209,12 +2209,12 @@ def main(argv=None):
 
     workspace_parent = argparse.ArgumentParser(add_help=False)
     workspace_parent.add_argument('-w', '--workspace',
-        default=fcconfig.workspace, required=workspace_required,
+        default=workspace, required=workspace_required,
         help='Workspace name (required if no default workspace configured)')
 
     proj_help = 'Project (workspace namespace). Required if no default ' \
                 'project was configured'
-    workspace_parent.add_argument('-p', '--project', default=fcconfig.project,
+    workspace_parent.add_argument('-p', '--project', default=project,
                         help=proj_help, required=proj_required)
 
     dest_space_parent = argparse.ArgumentParser(add_help=False)
@@ -2236,7 +2236,7 @@ def main(argv=None):
     etype_help = \
         "Entity type, required if no default entity_type was configured"
     etype_parent.add_argument('-t', '--entity-type', required=etype_required,
-                              default=fcconfig.entity_type, help=etype_help)
+                              default=entity_type, help=etype_help)
 
     # Commands that require an entity name
     entity_parent = argparse.ArgumentParser(add_help=False)
@@ -2248,14 +2248,14 @@ def main(argv=None):
     meth_parent.add_argument('-m', '--method', required=True,
                              help='method name')
     meth_parent.add_argument('-n', '--namespace', help='Method namespace',
-                             default=fcconfig.method_ns,
+                             default=method_ns,
                              required=meth_ns_required)
 
     # Commands that work with method configurations
     conf_parent = argparse.ArgumentParser(add_help=False)
     conf_parent.add_argument('-c', '--config', required=True,
                              help='Method config name')
-    conf_parent.add_argument('-n', '--namespace', default=fcconfig.method_ns,
+    conf_parent.add_argument('-n', '--namespace', default=method_ns,
                              help='Method config namespace',
                              required=meth_ns_required)
 
@@ -2298,7 +2298,7 @@ def main(argv=None):
     # Delete workspace
     subp = subparsers.add_parser('space_delete', description='Delete workspace')
     subp.add_argument('-w', '--workspace', help='Workspace name', required=True)
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+    subp.add_argument('-p', '--project', default=project,
                       help=proj_help, required=proj_required)
     subp.set_defaults(func=space_delete)
 
@@ -2324,7 +2324,7 @@ def main(argv=None):
                         'to which you have access. If you have a config ' +
                         'file which defines a default project, then only ' +
                         'the workspaces in that project will be listed.')
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+    subp.add_argument('-p', '--project', default=project,
             help='List spaces for projects whose names start with this ' +
             'prefix. You may also specify . (a dot), to list everything.')
     subp.set_defaults(func=space_list)
@@ -2545,7 +2545,7 @@ def main(argv=None):
     subp = subparsers.add_parser(
         'config_list', description='List available configurations')
     subp.add_argument('-w', '--workspace', help='Workspace name')
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+    subp.add_argument('-p', '--project', default=project,
                       help=proj_help)
     subp.add_argument('-c', '--config', default=None,
                       help='name of single workflow to search for (optional)')
@@ -2559,8 +2559,8 @@ def main(argv=None):
     subp = subparsers.add_parser('config_delete', parents=[conf_parent],
                                  description='Delete a workspace configuration')
     subp.add_argument('-w', '--workspace', help='Workspace name',
-                      default=fcconfig.workspace, required=workspace_required)
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+                      default=workspace, required=workspace_required)
+    subp.add_argument('-p', '--project', default=project,
                       help=proj_help, required=proj_required)
     subp.set_defaults(func=config_delete)
 
@@ -2569,8 +2569,8 @@ def main(argv=None):
         description='Retrieve method configuration definition',
         parents=[conf_parent])
     subp.add_argument('-w', '--workspace', help='Workspace name',
-                      default=fcconfig.workspace, required=workspace_required)
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+                      default=workspace, required=workspace_required)
+    subp.add_argument('-p', '--project', default=project,
                       help=proj_help, required=proj_required)
     subp.set_defaults(func=config_get)
     
@@ -2578,8 +2578,8 @@ def main(argv=None):
         description='Retrieve method configuration WDL',
         parents=[conf_parent])
     subp.add_argument('-w', '--workspace', help='Workspace name',
-                      default=fcconfig.workspace, required=workspace_required)
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+                      default=workspace, required=workspace_required)
+    subp.add_argument('-p', '--project', default=project,
                       help=proj_help, required=proj_required)
     subp.set_defaults(func=config_wdl)
     
@@ -2587,24 +2587,24 @@ def main(argv=None):
         description='Compare method configuration definitions across workspaces',
         parents=[conf_parent])
     subp.add_argument('-w', '--workspace', help='First Workspace name',
-                      default=fcconfig.workspace, required=workspace_required)
-    subp.add_argument('-p', '--project', default=fcconfig.project,
+                      default=workspace, required=workspace_required)
+    subp.add_argument('-p', '--project', default=project,
                       help="First " + proj_help, required=proj_required)
     subp.add_argument('-C', '--Config', help="Second method config name")
     subp.add_argument('-N', '--Namespace', help="Second method config namespace")
     subp.add_argument('-W', '--Workspace', help='Second Workspace name',
-                      default=fcconfig.workspace, required=workspace_required)
-    subp.add_argument('-P', '--Project', default=fcconfig.project,
+                      default=workspace, required=workspace_required)
+    subp.add_argument('-P', '--Project', default=project,
                       help="Second " + proj_help, required=proj_required)
     subp.set_defaults(func=config_diff)
 
     subp = subparsers.add_parser('config_copy', description=
         'Copy a method config to a new name/space/namespace/project, ' +
         'at least one of which MUST be specified.', parents=[conf_parent])
-    subp.add_argument('-p', '--fromproject', default=fcconfig.project,
+    subp.add_argument('-p', '--fromproject', default=project,
                       help=proj_help, required=proj_required)
     subp.add_argument('-s', '--fromspace', help='from workspace',
-                      default=fcconfig.workspace, required=workspace_required)
+                      default=workspace, required=workspace_required)
     subp.add_argument('-C', '--toname', help='name of the copied config')
     subp.add_argument('-S', '--tospace', help='destination workspace')
     subp.add_argument("-N", "--tonamespace", help="destination namespace")
@@ -2704,7 +2704,7 @@ def main(argv=None):
     # FIXME: this should explain that default entity is workspace
     subp.add_argument('-e', '--entity', help="Entity name or referenceData name.")
     subp.add_argument('-t', '--entity-type', choices=etype_choices + ['ref'],
-                      required=False, default=fcconfig.entity_type,
+                      required=False, default=entity_type,
                       help='Entity type to retrieve attributes from.')
     subp.add_argument('-s', '--ws_attrs', action='store_true',
                       help="Argument retrieves workspace attributes only (no referenceData attributes).")
@@ -2721,7 +2721,7 @@ def main(argv=None):
         'attr_delete', description="Delete attributes in a workspace",
         parents=[workspace_parent, attr_parent])
     subp.add_argument('-t', '--entity-type', choices=etype_choices,
-                      required=etype_required, default=fcconfig.entity_type,
+                      required=etype_required, default=entity_type,
                       help=etype_help)
     subp.add_argument('-e', '--entities', nargs='*', metavar="entity",
                       help='FireCloud entities')
@@ -2764,7 +2764,7 @@ def main(argv=None):
     subp = subparsers.add_parser('noop',
                                  description='Simple no-op command, for ' +
                                              'exercising interface')
-    subp.set_defaults(func=noop, proj=fcconfig.project, space=fcconfig.workspace)
+    subp.set_defaults(func=noop, proj=project, space=workspace)
 
     subp = subparsers.add_parser('config',
         description='Display value(s) of one or more configuration variables')
@@ -2847,7 +2847,7 @@ def main(argv=None):
     subp = subparsers.add_parser('supervise', description=sup_help,
                                  parents=[workspace_parent])
     subp.add_argument('workflow', help='Workflow description in DOT')
-    subp.add_argument('-n', '--namespace', default=fcconfig.method_ns,
+    subp.add_argument('-n', '--namespace', default=method_ns,
                       required=meth_ns_required,
                       help='Methods namespace')
     subp.add_argument('-s', '--sample-sets', nargs='+',
@@ -2911,10 +2911,22 @@ def main(argv=None):
     subp.add_argument('-e', '--entity',
         help="Show me what configurations can be run on this entity")
     subp.add_argument('-t', '--entity-type', choices=etype_choices,
-                      required=etype_required, default=fcconfig.entity_type,
+                      required=etype_required, default=entity_type,
                       help=etype_help)
     subp.set_defaults(func=runnable)
 
+    return parser
+
+def main(argv=None):
+    # Use this entry point to call high level api and have objects returned,
+    # (see firecloud/tests/highlevel_tests.py:call_func for usage examples)
+    if not argv:
+        argv = sys.argv
+
+    parser = _build_parser(fcconfig.project, fcconfig.method_ns,
+                           fcconfig.workspace, fcconfig.entity_type,
+                           fcconfig.root_url)
+
     # Create the .fiss directory if it doesn't exist
     fiss_home = os.path.expanduser("~/.fiss")
     if not os.path.isdir(fiss_home):
@@ -1,10 +1,28 @@
 import json
+from copy import deepcopy
 from os.path import isfile
 
 from firecloud.errors import FireCloudServerError
+from firecloud.fccore import config_get, lru_cache
 import firecloud.api as fapi
 
 
+# A method snapshot is immutable, so its template and inputs/outputs can be
+# fetched once per (namespace, name, snapshot_id) and reused. Its permissions
+# can be changed by anyone who owns it, so they are always fetched afresh
+@lru_cache(maxsize=256)
+def _get_template(namespace, name, snapshot_id):
+    r = fapi.get_config_template(namespace, name, snapshot_id)
+    fapi._check_response_code(r, 200)
+    return r.json()
+
+@lru_cache(maxsize=256)
+def _get_inputs_outputs(namespace, name, snapshot_id):
+    r = fapi.get_inputs_outputs(namespace, name, snapshot_id)
+    fapi._check_response_code(r, 200)
+    return r.json()
+
+
 class Method(object):
     """A FireCloud Method.
 
@@ -15,12 +33,13 @@ class Method(object):
         wdl (str): WDL description
         synopsis (str): Short description of task
         documentation (str): Extra documentation for method
-        api_url (str): FireCloud API root
+        api_url (str): FireCloud API root (default: the configured
+            root_url, which is where fapi sends all requests)
     """
 
     def __init__(self, namespace, name,
-                 snapshot_id, api_url=fapi.PROD_API_ROOT):
-        r = fapi.get_method(namespace, name, snapshot_id, api_url)
+                 snapshot_id, api_url=None):
+        r = fapi.get_repository_method(namespace, name, snapshot_id)
         fapi._check_response_code(r, 200)
 
         data = r.json()
@@ -30,11 +49,11 @@ class Method(object):
         self.wdl = data["payload"]
         self.synopsis = data["synopsis"]
         self.documentation = data["documentation"]
-        self.api_url = api_url
+        self.api_url = api_url or config_get('root_url')
 
     @staticmethod
     def new(namespace, name, wdl, synopsis,
-            documentation=None, api_url=fapi.PROD_API_ROOT):
+            documentation=None, api_url=None):
         """Create new FireCloud method.
 
         If the namespace + name already exists, a new snapshot is created.
@@ -46,30 +65,27 @@ class Method(object):
             synopsis (str): Short description of task
             documentation (file): Extra documentation for method
         """
-        r = fapi.update_workflow(namespace, name, synopsis,
-                                 wdl, documentation, api_url)
+        r = fapi.update_repository_method(namespace, name, synopsis,
+                                          wdl, documentation)
         fapi._check_response_code(r, 201)
         d = r.json()
-        return Method(namespace, name, d["snapshotId"])
+        return Method(namespace, name, d["snapshotId"], api_url)
 
     def template(self):
         """Return a method template for this method."""
-        r = fapi.get_config_template(self.namespace, self.name,
-                                        self.snapshot_id, self.api_url)
-        fapi._check_response_code(r, 200)
-        return r.json()
+        # Callers typically fill in the template, so hand out a copy
+        return deepcopy(_get_template(self.namespace, self.name,
+                                      self.snapshot_id))
 
     def inputs_outputs(self):
         """Get information on method inputs & outputs."""
-        r = fapi.get_inputs_outputs(self.namespace, self.name,
-                                    self.snapshot_id, self.api_url)
-        fapi._check_response_code(r, 200)
-        return r.json()
+        return deepcopy(_get_inputs_outputs(self.namespace, self.name,
+                                            self.snapshot_id))
 
     def acl(self):
         """Get the access control list for this method."""
         r = fapi.get_repository_method_acl(
-            self.namespace, self.name, self.snapshot_id, self.api_url)
+            self.namespace, self.name, self.snapshot_id)
         fapi._check_response_code(r, 200)
         return r.json()
 
@@ -81,9 +97,9 @@ class Method(object):
                 one of {one of "OWNER", "READER", "WRITER", "NO ACCESS"}
             users (list(str)): List of users to give role to
         """
-        acl_updates = [{"user": user, "role": role} for user in users]
+        # requests can encode a tuple but not a generator as the JSON body
+        acl_updates = tuple({"user": user, "role": role} for user in users)
         r = fapi.update_repository_method_acl(
-            self.namespace, self.name, self.snapshot_id,
-            acl_updates, self.api_url
+            self.namespace, self.name, self.snapshot_id, acl_updates
         )
         fapi._check_response_code(r, 200)
@@ -1,6 +1,7 @@
 import json
 
 import firecloud.api as fapi
+from firecloud import fccore
 
 class Submission(object):
     """A FireCloud method configuration
@@ -9,25 +10,25 @@ class Submission(object):
         namespace (str): workspace namespace
         workspace (str): workspace name
         submission_id (int): Unique submission identifier
-        api_url (str): FireCloud API root
+        api_url (str): FireCloud API root (default: the configured
+            root_url, which is where fapi sends all requests)
     """
 
     def __init__(self, namespace, workspace,
-                 submission_id, api_url=fapi.PROD_API_ROOT):
-        r = fapi.get_submission(namespace, workspace,
-                                submission_id, api_url)
+                 submission_id, api_url=None):
+        r = fapi.get_submission(namespace, workspace, submission_id)
         fapi._check_response_code(r, 200)
 
         self.namespace = namespace
         self.workspace = workspace
         self.submission_id = submission_id
-        self.api_url = api_url
+        self.api_url = api_url or fccore.config_get('root_url')
 
     @staticmethod
     def new(wnamespace, workspace, cnamespace, config,
-            entity_id, etype, expression, api_url=fapi.PROD_API_ROOT):
-        r, c = fapi.create_submission(wnamespace, workspace, cnamespace,
-                                      config, entity_id, expression,
-                                      api_url)
+            entity_id, etype, expression, api_url=None):
+        r = fapi.create_submission(wnamespace, workspace, cnamespace,
+                                   config, entity_id, etype, expression)
         fapi._check_response_code(r, 201)
-        #return Submission(wnamespace, workspace, ??)
+        data = r.json()
+        return Submission(wnamespace, workspace, data['submissionId'], api_url)
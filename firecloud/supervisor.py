@@ -1,13 +1,54 @@
+import os
 import time
-import pydot
+import re
 import logging
 import json
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import wraps
+from six.moves import intern
 
 from firecloud import api as fapi
 
+# Use orjson, if installed, for the supervisor's JSON (checkpoints, and the
+# log of updates between them)
+try:
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+    _json_loads = json.loads
+
+# Python 2 has no os.replace; there os.rename does the same on POSIX systems,
+# replacing the destination atomically
+_replace_file = getattr(os, 'replace', os.rename)
+
 logging.basicConfig(format='%(asctime)s::%(levelname)s  %(message)s',
                     datefmt='%Y-%m-%d %I:%M:%S', level=logging.INFO)
 
+# Maximum number of submission requests (creating or polling) to have in
+# flight at once; kept within the connection pool of fapi's session
+SUBMISSION_WORKERS = min(16, fapi.SESSION_POOL_SIZE)
+
+# Seconds to wait between polls of FireCloud. After a cycle in which some task
+# changed state the wait drops back to the minimum, and after each one in which
+# nothing did it grows by POLL_BACKOFF, up to the maximum. The bounds may be
+# overridden with the FISS_SUPERVISOR_MIN_POLL/_MAX_POLL environment variables
+MIN_POLL_INTERVAL = 2
+MAX_POLL_INTERVAL = 60
+POLL_BACKOFF = 1.5
+
+# While no more than this many submissions are running, poll each of them
+# individually; beyond it, a single listing of the workspace's submissions
+# is cheaper than that many requests
+SUBMISSION_LIST_THRESHOLD = 10
+
+# Task updates are appended to a log beside the recovery file as they happen,
+# and the full checkpoint is rewritten (emptying the log) once this many
+# have accumulated
+CHECKPOINT_INTERVAL = 100
+
 
 def supervise(project, workspace, namespace, workflow,
               sample_sets, recovery_file):
@@ -39,35 +80,194 @@ def supervise(project, workspace, namespace, workflow,
     supervise_until_complete(monitor_data, dependencies, args, recovery_file)
 
 
+# Tokens of the DOT language: IDs (quoted or bare), numbers (only as attribute
+# values), edge operators and punctuation. Whitespace and comments are
+# matched so they can be skipped. Anything else, e.g. ports or HTML strings,
+# is not supported, and is rejected rather than misread
+_DOT_TOKEN = re.compile(r'''
+      (?P<id>"(?:[^"\\]|\\.)*"|[\w.]+)
+    | (?P<number>-[\d.]+)
+    | (?P<edge>->|--)
+    | (?P<punct>[\[\]=,;{}])
+    | (?P<skip>\s+|//[^\n]*|\#[^\n]*|/\*.*?\*/)
+''', re.VERBOSE | re.DOTALL)
+
+_DOT_KEYWORDS = {'strict', 'graph', 'digraph', 'node', 'edge', 'subgraph'}
+
+
+class _DotParser(object):
+    """ Recursive descent parser for the subset of DOT read by parse_dot """
+
+    def __init__(self, graph_data):
+        self.graph_data = graph_data
+        self.tokens = []
+        pos = 0
+        while pos < len(graph_data):
+            m = _DOT_TOKEN.match(graph_data, pos)
+            if m is None:
+                self.error("unsupported syntax", pos)
+            if m.lastgroup != 'skip':
+                self.tokens.append((m.lastgroup, m.group(), pos))
+            pos = m.end()
+        self.tokens.append((None, None, pos))
+        self.i = 0
+        self.nodes = dict()
+        self.edges = []
+
+    def error(self, message, pos=None):
+        if pos is None:
+            pos = self.tokens[self.i][2]
+        line = self.graph_data.count('\n', 0, pos) + 1
+        found = self.graph_data[pos:pos+20].split('\n')[0] or 'end of file'
+        raise ValueError("Invalid workflow DOT, line {0}: {1} at '{2}'".format(
+                         line, message, found))
+
+    def peek(self, offset=0):
+        return self.tokens[self.i + offset]
+
+    def is_keyword(self, token, *keywords):
+        return token[0] == 'id' and token[1].lower() in keywords
+
+    def expect(self, value):
+        if self.peek()[1] != value:
+            self.error("expected '" + value + "'")
+        self.i += 1
+
+    def name(self):
+        # A node name or attribute (not a keyword, which must be quoted)
+        kind, value, _ = self.peek()
+        if kind != 'id' or value.lower() in _DOT_KEYWORDS:
+            self.error("expected a name")
+        self.i += 1
+        # Names recur as keys throughout the monitor data, so intern them
+        if value.startswith('"'):
+            value = value[1:-1].replace('\\"', '"')
+        return intern(value)
+
+    def value(self):
+        # An attribute value, which may also be a (negative) number
+        if self.peek()[0] == 'number':
+            self.i += 1
+            return self.peek(-1)[1]
+        return self.name()
+
+    def graph(self):
+        # graph : [ strict ] ( graph | digraph ) [ ID ] '{' stmt_list '}'
+        if self.is_keyword(self.peek(), 'strict'):
+            self.i += 1
+        if not self.is_keyword(self.peek(), 'graph', 'digraph'):
+            self.error("expected 'digraph'")
+        self.i += 1
+        if self.peek()[1] != '{':
+            self.name()
+        self.block()
+        if self.peek()[0] is not None:
+            self.error("unexpected text after the graph")
+
+    def block(self):
+        # '{' stmt_list '}', where statements may end with ';'
+        self.expect('{')
+        while self.peek()[1] != '}':
+            if self.peek()[0] is None:
+                self.error("expected '}'")
+            self.statement()
+            if self.peek()[1] == ';':
+                self.i += 1
+        self.i += 1
+
+    def attr_lists(self):
+        # Zero or more [ k=v, ... ] lists
+        attrs = dict()
+        while self.peek()[1] == '[':
+            self.i += 1
+            while self.peek()[1] != ']':
+                key = self.name()
+                self.expect('=')
+                attrs[key] = self.value()
+                if self.peek()[1] in (',', ';'):
+                    self.i += 1
+            self.i += 1
+        return attrs
+
+    def statement(self):
+        token = self.peek()
+        if self.is_keyword(token, 'graph', 'node', 'edge'):
+            # Default attributes, which a workflow does not use
+            self.i += 1
+            self.attr_lists()
+        elif self.is_keyword(token, 'subgraph') or token[1] == '{':
+            # Subgraphs only group statements; their nodes and edges count
+            # as those of the graph. They cannot be used as edge endpoints
+            if token[1] != '{':
+                self.i += 1
+                if self.peek()[1] != '{':
+                    self.name()
+            self.block()
+            if self.peek()[0] == 'edge':
+                self.error("edges to or from subgraphs are not supported")
+        elif token[0] == 'id' and self.peek(1)[1] == '=':
+            # Graph attribute, e.g. rankdir=LR
+            self.name()
+            self.i += 1
+            self.value()
+        else:
+            chain = [self.name()]
+            while self.peek()[0] == 'edge':
+                self.i += 1
+                if self.peek()[1] == '{':
+                    self.error("edges to or from subgraphs are not supported")
+                chain.append(self.name())
+            attrs = self.attr_lists()
+
+            for name in chain:
+                self.nodes.setdefault(name, None)
+            for source, dest in zip(chain, chain[1:]):
+                self.edges.append((source, dest, dict(attrs)))
+
+
+def parse_dot(graph_data):
+    """ Extract the nodes and edges of a workflow written in DOT.
+
+        Only the subset of DOT needed to describe a workflow is understood:
+        a single graph of node and edge statements, with optional attribute
+        lists. Graph, node and edge default attributes are skipped, and the
+        statements of subgraphs are read as those of the graph. Anything
+        else, such as ports, HTML strings or edges to subgraphs, raises
+        ValueError.
+
+        Returns a list of node names, in order of first appearance, and a list
+        of (source, destination, attributes) edges. Names and attribute values
+        are unquoted, e.g. satisfiedMode="OnComplete" gives 'OnComplete'.
+    """
+    parser = _DotParser(graph_data)
+    parser.graph()
+    return list(parser.nodes), parser.edges
+
+
 def init_supervisor_data(dotfile, sample_sets):
     """ Parse a workflow description written in DOT (like Firehose)"""
     with open(dotfile) as wf:
         graph_data = wf.read()
 
-    graph = pydot.graph_from_dot_data(graph_data)[0]
-    nodes = [n.get_name().strip('"') for n in graph.get_nodes()]
+    nodes, edges = parse_dot(graph_data)
 
     monitor_data = dict()
     dependencies = {n:[] for n in nodes}
 
-    # Initialize empty list of dependencies
+    # Initialize empty list of dependencies. Every task record is created
+    # with the same keys, so they all share one shape for the whole run
     for n in nodes:
         monitor_data[n] = dict()
         for sset in sample_sets:
             monitor_data[n][sset] = {
                 'state'        : "Not Started",
                 'evaluated'    : False,
-                'succeeded'    : False
+                'succeeded'    : False,
+                'submissionId' : None
             }
 
-    edges = graph.get_edges()
-
     # Iterate over the edges, and get the dependency information for each node
-    for e in edges:
-        source = e.get_source().strip('"')
-        dest = e.get_destination().strip('"')
-
-        dep = e.get_attributes()
+    for source, dest, dep in edges:
         dep['upstream_task'] = source
 
         dependencies[dest].append(dep)
@@ -75,36 +275,128 @@ def init_supervisor_data(dotfile, sample_sets):
     return monitor_data, dependencies
 
 
+def index_dependencies(dependencies):
+    """ Resolve the static parts of each node's dependency list up front, so
+        the monitor loop does not re-read edge attributes on every poll.
+
+        Returns a dict mapping each node to a tuple of
+        (upstream task name, must upstream task succeed) pairs
+    """
+    dep_index = dict()
+    for n, deps in dependencies.items():
+        # Task must have succeeded for OnComplete; 'Always' and 'Optional'
+        # run once the deps have been evaluated. Checkpoints from older
+        # versions of FISS kept the quotes around the mode
+        dep_index[n] = tuple((dep['upstream_task'],
+                              dep.get('satisfiedMode', '').strip('"') == 'OnComplete')
+                             for dep in deps)
+    return dep_index
+
+
+def index_graph(dependencies):
+    """ Build the indexes of the workflow graph used by the monitor loop.
+        They depend only on the workflow, so are saved with the recovery
+        data and reused when the supervisor is resumed.
+
+        Returns a dict with 'upstream', as from index_dependencies, and
+        'downstream', mapping each node to a tuple of the tasks that
+        depend on it
+    """
+    downstream = {n: [] for n in dependencies}
+    for n, deps in dependencies.items():
+        for dep in deps:
+            downstream[dep['upstream_task']].append(n)
+
+    return {
+        'upstream'   : index_dependencies(dependencies),
+        'downstream' : {n: tuple(d) for n, d in downstream.items()}
+    }
+
+
+def _ttl_cache(seconds):
+    """ Memoize a function of hashable arguments, reusing each result for at
+        most the given number of seconds. The wrapped function gains a
+        cache_clear() method, to force a refresh.
+    """
+    def decorator(func):
+        cache = dict()
+
+        @wraps(func)
+        def wrapper(*args):
+            now = time.time()
+            if args in cache:
+                value, timestamp = cache[args]
+                if now - timestamp < seconds:
+                    return value
+            value = func(*args)
+            cache[args] = (value, now)
+            return value
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+@_ttl_cache(seconds=300)
+def _cached_space_configs(project, workspace):
+    """ Task configurations in the workspace, as a dict keyed by name """
+    r = fapi.list_workspace_configs(project, workspace)
+    fapi._check_response_code(r, 200)
+    return { c["name"]: c for c in r.json()}
+
+
+@_ttl_cache(seconds=300)
+def _cached_repo_methods():
+    """ Workflows the user has view permissions for, in a form that is more
+        easily searchable: (namespace, name, snapshot)
+    """
+    r = fapi.list_repository_methods()
+    fapi._check_response_code(r, 200)
+    # Snapshot ids are compared as strings, as configurations may give the
+    # method version as either a number or a string
+    return {(m['namespace'], m['name'], str(m['snapshotId']))
+            for m in r.json() if m['entityType'] == 'Workflow'}
+
+
+def poll_intervals():
+    """ The minimum and maximum seconds to wait between polls, as overridden
+        in the environment. Values that are not numbers are ignored, and the
+        minimum is kept to at least a second, so FireCloud is never polled
+        in a tight loop
+    """
+    def from_env(name, default):
+        value = os.environ.get(name)
+        if value is None:
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            logging.warning("Ignoring {0}={1}, which is not a number".format(
+                            name, value))
+            return default
+
+    min_interval = max(1, from_env('FISS_SUPERVISOR_MIN_POLL',
+                                   MIN_POLL_INTERVAL))
+    max_interval = max(min_interval, from_env('FISS_SUPERVISOR_MAX_POLL',
+                                              MAX_POLL_INTERVAL))
+    return min_interval, max_interval
+
+
 def validate_monitor_tasks(dependencies, args):
     """ Validate that all entries in the supervisor are valid task configurations and
         that all permissions requirements are satisfied.
     """
-    # Make a list of all task configurations needed to supervise
-    sup_configs = sorted(dependencies.keys())
-
-
     try:
         logging.info("Validating supervisor data...")
-        # Make an api call to list task configurations in the workspace
-        r = fapi.list_workspace_configs(args['project'], args['workspace'])
-        fapi._check_response_code(r, 200)
-        space_configs = r.json()
-
-        # Make a dict for easy lookup later
-        space_configs = { c["name"]: c for c in space_configs}
-
-        # Also make an api call to list methods you have view permissions for
-        r = fapi.list_repository_methods()
-        fapi._check_response_code(r, 200)
-        repo_methods = r.json()
-
-        ## Put in a form that is more easily searchable: namespace/name:snapshot
-        repo_methods = {m['namespace'] + '/' + m['name'] + ':' + str(m['snapshotId'])
-                        for m in repo_methods if m['entityType'] == 'Workflow'}
+        # List task configurations in the workspace, and the methods you have
+        # view permissions for; both are reused across recent validations
+        space_configs = _cached_space_configs(args['project'], args['workspace'])
+        repo_methods = _cached_repo_methods()
 
         valid = True
 
-        for config in sup_configs:
+        # Check each task configuration needed to supervise
+        for config in dependencies:
             # ensure config exists in the workspace
             if config not in space_configs:
                 logging.error("No task configuration for "
@@ -114,10 +406,11 @@ def validate_monitor_tasks(dependencies, args):
             else:
                 # Check access permissions for the referenced method
                 m = space_configs[config]['methodRepoMethod']
-                ref_method = m['methodNamespace'] + "/" + m['methodName'] + ":" + str(m['methodVersion'])
+                ref_method = (m['methodNamespace'], m['methodName'],
+                              str(m['methodVersion']))
                 if ref_method not in repo_methods:
                     logging.error(config+ " -- You don't have permisson to run the referenced method: "
-                                  + ref_method)
+                                  + "{0}/{1}:{2}".format(*ref_method))
                     valid = False
 
     except Exception as e:
@@ -131,159 +424,364 @@ def recover_and_supervise(recovery_file):
     """ Retrieve monitor data from recovery_file and resume monitoring """
     try:
         logging.info("Attempting to recover Supervisor data from " + recovery_file)
-        with open(recovery_file) as rf:
-            recovery_data = json.load(rf)
-            monitor_data = recovery_data['monitor_data']
-            dependencies = recovery_data['dependencies']
-            args = recovery_data['args']
+        recovery_data = read_recovery_data(recovery_file)
+        monitor_data = recovery_data['monitor_data']
+        dependencies = recovery_data['dependencies']
+        args = recovery_data['args']
+        # Checkpoints from older versions do not include the graph indexes
+        graph_index = recovery_data.get('graph_index')
 
     except:
         logging.error("Could not recover monitor data, exiting...")
         return 1
 
     logging.info("Data successfully loaded, resuming Supervisor")
-    supervise_until_complete(monitor_data, dependencies, args, recovery_file)
+    supervise_until_complete(monitor_data, dependencies, args, recovery_file,
+                             graph_index)
 
 
-def supervise_until_complete(monitor_data, dependencies, args, recovery_file):
+def create_submission(project, workspace, namespace, config, sset):
+    """ Submit a task configuration on a sample_set, retrying on failure.
+        Returns the new submission id, or None if every attempt failed.
+    """
+    # How to handle errors at this step?
+    for retry in range(3):
+        r = fapi.create_submission(
+            project, workspace, namespace, config,
+            sset, etype="sample_set", expression=None
+        )
+        if r.status_code == 201:
+            return r.json()['submissionId']
+        else:
+            # There was an error, under certain circumstances retry
+            logging.debug("Create_submission for " + config
+                          + " failed on " + sset + " with the following response:"
+                          + r.text + "\nRetrying...")
+
+    logging.error("Maximum retries exceeded")
+    return None
+
+
+def write_recovery_data(recovery_file, recovery_data):
+    """ Save the state of the monitor for recovery purposes. This supersedes
+        any updates logged by log_recovery_updates, so the log is removed
+    """
+    # Each checkpoint gets a new id, with which the updates logged after it
+    # are stamped. Should a crash come after the checkpoint is replaced but
+    # before the log is removed, the stale updates in the log are then told
+    # apart, and are not replayed over the newer checkpoint
+    recovery_data['checkpoint_id'] = uuid.uuid4().hex
+    data = _json_dumps(recovery_data)
+
+    # Write aside and rename over the old checkpoint, so a crash part way
+    # through writing can never leave a corrupt recovery file behind
+    temp_file = recovery_file + '.tmp'
+    with open(temp_file, 'wb') as rf:
+        rf.write(data)
+    _replace_file(temp_file, recovery_file)
+
+    if os.path.exists(recovery_file + '.wal'):
+        os.remove(recovery_file + '.wal')
+
+
+def log_recovery_updates(recovery_file, recovery_data, updates):
+    """ Append the current records of the updated (task, sample_set) pairs
+        to the log of changes since recovery_file was last written
+    """
+    checkpoint_id = recovery_data['checkpoint_id']
+    monitor_data = recovery_data['monitor_data']
+    with open(recovery_file + '.wal', 'ab') as wal:
+        for n, sset in updates:
+            wal.write(_json_dumps([checkpoint_id, n, sset,
+                                   monitor_data[n][sset]]) + b'\n')
+        # Submissions are recorded here, so make sure they reach the disk
+        wal.flush()
+        os.fsync(wal.fileno())
+
+
+def read_recovery_data(recovery_file):
+    """ Load monitor state saved by write_recovery_data, with any updates
+        logged since
+    """
+    with open(recovery_file, 'rb') as rf:
+        recovery_data = _json_loads(rf.read())
+
+    if os.path.exists(recovery_file + '.wal'):
+        checkpoint_id = recovery_data.get('checkpoint_id')
+        monitor_data = recovery_data['monitor_data']
+        with open(recovery_file + '.wal', 'rb') as wal:
+            for line in wal:
+                try:
+                    logged_id, n, sset, task_data = _json_loads(line)
+                except ValueError:
+                    # The last entry was cut short by a crash
+                    break
+                # Skip updates logged before the checkpoint was written,
+                # which it already includes
+                if logged_id == checkpoint_id:
+                    monitor_data[n][sset] = task_data
+
+    return recovery_data
+
+
+def get_submissions(project, workspace, submission_ids):
+    """ Fetch the current status of the given submissions.
+
+        Returns a dict mapping submission id to its status record. Ids whose
+        status could not be fetched are left out, to be polled again later.
+    """
+    if len(submission_ids) > SUBMISSION_LIST_THRESHOLD:
+        # Keep only the submissions asked for, rather than the whole
+        # history of the workspace
+        r = fapi.list_submissions(project, workspace)
+        fapi._check_response_code(r, 200)
+        return {s["submissionId"]: s for s in r.json()
+                if s["submissionId"] in submission_ids}
+
+    # Each status is an independent request, so issue them concurrently
+    def get_submission(submission_id):
+        try:
+            return fapi.get_submission(project, workspace, submission_id)
+        except Exception as e:
+            logging.warning("Could not get status of submission "
+                            + submission_id + ": " + str(e))
+            return None
+
+    submission_ids = list(submission_ids)
+    workers = min(SUBMISSION_WORKERS, len(submission_ids))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        responses = list(executor.map(get_submission, submission_ids))
+
+    submissions = dict()
+    for submission_id, r in zip(submission_ids, responses):
+        if r is None:
+            continue
+        if r.status_code == 200:
+            submissions[submission_id] = r.json()
+        else:
+            logging.warning("Could not get status of submission "
+                            + submission_id + ": " + r.text)
+    return submissions
+
+
+def submission_succeeded(submission):
+    """ Whether none of the workflows in a finished submission failed """
+    if 'workflowStatuses' in submission:
+        # A list_submissions entry maps each workflow status to the number
+        # of workflows in it, e.g. {"Succeeded": 2, "Failed": 1}; a status
+        # may be absent or have count 0
+        return submission['workflowStatuses'].get('Failed', 0) == 0
+    # A get_submission record lists the workflows themselves
+    return all(w['status'] != 'Failed' for w in submission['workflows'])
+
+
+def submit_tasks(project, workspace, namespace, tasks):
+    """ Submit (task, sample_set) pairs concurrently, since each submission is
+        an independent request, rather than paying one round trip per task.
+
+        Yields ((task, sample_set), submission id) as each submission returns,
+        with a submission id of None when it could not be made.
+    """
+    workers = min(SUBMISSION_WORKERS, len(tasks))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = dict()
+        for n, sset in tasks:
+            logging.info("Starting workflow " + n + " on " + sset)
+            future = executor.submit(create_submission, project,
+                                     workspace, namespace, n, sset)
+            futures[future] = (n, sset)
+
+        # Hand back each submission as soon as it returns; one that raises
+        # must not cost us the ids of those that succeeded
+        for future in as_completed(futures):
+            n, sset = futures[future]
+            try:
+                submission_id = future.result()
+            except Exception as e:
+                logging.error("Create_submission for " + n + " failed on "
+                              + sset + ": " + str(e))
+                submission_id = None
+            yield (n, sset), submission_id
+
+
+def supervise_until_complete(monitor_data, dependencies, args, recovery_file,
+                             graph_index=None):
     """ Supervisor loop. Loop forever until all tasks are evaluated or completed """
     project = args['project']
     workspace = args['workspace']
     namespace = args['namespace']
     sample_sets = args['sample_sets']
-    recovery_data = {'args': args}
+    if graph_index is None:
+        graph_index = index_graph(dependencies)
+    recovery_data = {
+        'args' : args,
+        'monitor_data' : monitor_data,
+        'dependencies' : dependencies,
+        'graph_index' : graph_index
+    }
 
     if not validate_monitor_tasks(dependencies, args):
         logging.error("Errors found, aborting...")
         return
 
-    while True:
-        # There are 4 possible states for each node:
-        #   1. Not Started -- In this state, check all the dependencies for the
-        #         node (possibly 0). If all of them have been evaluated, and the
-        #         satisfiedMode is met, start the task, change to "Running". if
-        #         satisfiedMode is not met, change to "Evaluated"
-        #
-        #   2. Running -- Submitted in FC. Check the submission endpoint, and
-        #         if it has completed, change to "Completed", set evaluated=True,
-        #         and whether the task succeeded
-        #         Otherwise, do nothing
-        #
-        #   3. Completed -- Job ran in FC and either succeeded or failed. Do nothing
-        #   4. Evaluated -- All dependencies evaluated, but this task did not run
-        #         do nothing
+    # There are 4 possible states for each node:
+    #   1. Not Started -- In this state, check all the dependencies for the
+    #         node (possibly 0). If all of them have been evaluated, and the
+    #         satisfiedMode is met, start the task, change to "Running". if
+    #         satisfiedMode is not met, change to "Evaluated"
+    #
+    #   2. Running -- Submitted in FC. Check the submission endpoint, and
+    #         if it has completed, change to "Completed", set evaluated=True,
+    #         and whether the task succeeded
+    #         Otherwise, do nothing
+    #
+    #   3. Completed -- Job ran in FC and either succeeded or failed. Do nothing
+    #   4. Evaluated -- All dependencies evaluated, but this task did not run
+    #         do nothing
+    #
+    # Rather than rescanning every task each cycle, only the tasks that can
+    # make progress are visited: the Running ones, and Not Started ones whose
+    # upstream tasks have all just been evaluated (the ready queue).
+
+    # Resolve each upstream task name to its monitor data once, so checking
+    # a dependency on a sample set is a single lookup. Keep separate arrays of
+    # all upstream tasks and of those that must succeed (OnComplete), so that
+    # neither check has to test a per-dependency flag
+    upstream_data = dict()
+    required_data = dict()
+    for n, upstream in graph_index['upstream'].items():
+        upstream_data[n] = tuple(monitor_data[u] for u, _ in upstream)
+        required_data[n] = tuple(monitor_data[u] for u, must_succeed in upstream
+                                 if must_succeed)
+
+    # Tasks to revisit when a node is evaluated
+    downstream = graph_index['downstream']
+
+    # For each (task, sample_set) not yet evaluated, the number of upstream
+    # tasks still to be evaluated on that sample set. A recovered run may
+    # already have evaluated, or started, some of them.
+    blocked = dict()
+    ready = deque()
+    running = dict()        # (task, sample_set) pairs, in submission order
+    for n in dependencies:
+        for sset in sample_sets:
+            task_data = monitor_data[n][sset]
+            if task_data['evaluated']:
+                continue
+            if task_data['state'] == "Running":
+                running[(n, sset)] = None
+            blocked[(n, sset)] = sum(not u[sset]['evaluated']
+                                     for u in upstream_data[n])
+            if task_data['state'] == "Not Started" and blocked[(n, sset)] == 0:
+                ready.append((n, sset))
+    total = len(dependencies) * len(sample_sets)
+
+    def mark_evaluated(n, sset):
+        # Queue any downstream task that this leaves with no upstream tasks
+        # left to wait on. Only tasks yet to start are queued, so a task is
+        # never submitted twice
+        monitor_data[n][sset]['evaluated'] = True
+        del blocked[(n, sset)]
+        for child in downstream[n]:
+            if (child, sset) in blocked:
+                blocked[(child, sset)] -= 1
+                if blocked[(child, sset)] == 0 and \
+                        monitor_data[child][sset]['state'] == "Not Started":
+                    ready.append((child, sset))
+
+    # Start from a full checkpoint, so that the updates logged from here on
+    # apply to it (this also folds in any replayed on recovery)
+    write_recovery_data(recovery_file, recovery_data)
+    logged = 0
+
+    min_interval, max_interval = poll_intervals()
+    delay = min_interval
 
-        # Keep a tab of the number of jobs in each category
-        running = 0
-        waiting = 0
-        completed = 0
+    while True:
+        # (task, sample_set) pairs that changed state during this cycle
+        updates = []
 
-        # Get the submissions
-        r = fapi.list_submissions(project, workspace)
-        sub_list = r.json()
-        #TODO: filter this list by submission time first?
-        sub_lookup = {s["submissionId"]: s for s in sub_list}
+        if running:
+            # Get the submissions this supervisor is waiting on
+            active_ids = {monitor_data[n][sset]['submissionId']
+                          for n, sset in running}
+            sub_lookup = get_submissions(project, workspace, active_ids)
 
-        # Keys of dependencies is the list of tasks to run
-        for n in dependencies:
-            for sset in sample_sets:
+            for n, sset in list(running):
                 task_data = monitor_data[n][sset]
-                if task_data['state'] == "Not Started":
-                    # See if all of the dependencies have been evaluated
-                    upstream_evaluated = True
-                    for dep in dependencies[n]:
-                        # Look up the status of the task
-                        upstream_task_data = monitor_data[dep['upstream_task']][sset]
-                        if not upstream_task_data.get('evaluated'):
-                            upstream_evaluated = False
-
-                    # if all of the dependencies have been evaluated, we can evaluate
-                    # this node
-                    if upstream_evaluated:
-                        # Now check the satisfied Mode of all the dependencies
-                        should_run = True
-                        for dep in dependencies[n]:
-                            upstream_task_data = monitor_data[dep['upstream_task']][sset]
-                            mode = dep['satisfiedMode']
-
-                            # Task must have succeeded for OnComplete
-                            if mode == '"OnComplete"' and not upstream_task_data['succeeded']:
-                                should_run = False
-                            # 'Always' and 'Optional' run once the deps have been
-                            # evaluated
-
-                        if should_run:
-                            # Submit the workflow to FC
-                            fc_config = n
-                            logging.info("Starting workflow " + fc_config + " on " + sset)
-
-                            # How to handle errors at this step?
-                            for retry in range(3):
-                                r = fapi.create_submission(
-                                    project, workspace, namespace, fc_config,
-                                    sset, etype="sample_set", expression=None
-                                )
-                                if r.status_code == 201:
-                                    task_data['submissionId'] = r.json()['submissionId']
-                                    task_data['state'] = "Running"
-                                    running += 1
-                                    break
-                                else:
-                                    # There was an error, under certain circumstances retry
-                                    logging.debug("Create_submission for " + fc_config
-                                                  + "failed on " + sset + " with the following response:"
-                                                  + r.content + "\nRetrying...")
-
-                            else:
-                                # None of the attempts above succeeded, log an error, mark as failed
-                                logging.error("Maximum retries exceeded")
-                                task_data['state'] = 'Completed'
-                                task_data['evaluated'] = True
-                                task_data['succeeded'] = False
-
-                        else:
-                            # This task will never be able to run, mark evaluated
-                            task_data['state'] = "Evaluated"
-                            task_data['evaluated'] = True
-                            completed += 1
-                    else:
-                        waiting += 1
-
-                elif task_data['state'] == "Running":
-                    submission = sub_lookup[task_data['submissionId']]
-                    status = submission['status']
-
-                    if status == "Done":
-                        # Look at the individual workflows to see if there were
-                        # failures
-                        logging.info("Workflow " + n + " completed for " + sset)
-                        success = 'Failed' not in submission['workflowStatuses']
-                        task_data['evaluated'] = True
-                        task_data['succeeded'] = success
-                        task_data['state'] = "Completed"
-
-                        completed += 1
-                    else:
-                        # Submission isn't done, don't do anything
-                        running += 1
-
+                submission = sub_lookup.get(task_data['submissionId'])
+                if submission is not None and submission['status'] == "Done":
+                    # Look at the individual workflows to see if there were
+                    # failures
+                    logging.info("Workflow " + n + " completed for " + sset)
+                    task_data['succeeded'] = submission_succeeded(submission)
+                    task_data['state'] = "Completed"
+                    del running[(n, sset)]
+                    mark_evaluated(n, sset)
+                    updates.append((n, sset))
+                # Otherwise the submission isn't done, don't do anything
+
+        # Evaluate every task whose dependencies have all been evaluated.
+        # Doing so can make further tasks ready, as can a failed submission,
+        # so keep going until none are left
+        while ready:
+            to_submit = []
+            while ready:
+                n, sset = ready.popleft()
+                task_data = monitor_data[n][sset]
+                # All of the dependencies have been evaluated, so check
+                # whether their satisfiedMode is met
+                if all(u[sset]['succeeded'] for u in required_data[n]):
+                    # Submit the workflow to FC together with any other
+                    # tasks ready to start
+                    to_submit.append((n, sset))
                 else:
-                    # Either Completed or evaluated
-                    completed += 1
-
-                # Save the state of the monitor for recovery purposes
-                # Have to do this for every workflow + sample_set so we don't lose track of any
-                recovery_data['monitor_data'] = monitor_data
-                recovery_data['dependencies'] = dependencies
-
-                with open(recovery_file, 'w') as rf:
-                    json.dump(recovery_data, rf)
+                    # This task will never be able to run, mark evaluated
+                    task_data['state'] = "Evaluated"
+                    mark_evaluated(n, sset)
+                    updates.append((n, sset))
+
+            if to_submit:
+                for (n, sset), submission_id in submit_tasks(
+                        project, workspace, namespace, to_submit):
+                    task_data = monitor_data[n][sset]
+                    updates.append((n, sset))
+                    if submission_id is not None:
+                        task_data['submissionId'] = submission_id
+                        task_data['state'] = "Running"
+                        running[(n, sset)] = None
+                    else:
+                        # The submission could not be made, mark as failed
+                        task_data['state'] = 'Completed'
+                        task_data['succeeded'] = False
+                        mark_evaluated(n, sset)
+
+        # Save the state of the monitor once per cycle, after any submissions
+        # so that none of them are lost track of. While nothing changes, e.g.
+        # during hours of waiting on running jobs, there is nothing to save.
+        # Otherwise log just the tasks that changed, and rewrite the whole
+        # checkpoint only every so often
+        unevaluated = len(blocked)
+        if updates:
+            logged += len(updates)
+            if logged >= CHECKPOINT_INTERVAL or unevaluated == 0:
+                write_recovery_data(recovery_file, recovery_data)
+                logged = 0
+            else:
+                log_recovery_updates(recovery_file, recovery_data, updates)
 
-        logging.info("{0} Waiting, {1} Running, {2} Completed".format(waiting, running, completed))
+        # Keep a tab of the number of jobs in each category
+        logging.info("{0} Waiting, {1} Running, {2} Completed".format(
+            unevaluated - len(running), len(running), total - unevaluated))
 
         # If all tasks have been evaluated, we are done
-        if all(monitor_data[n][sset]['evaluated']
-                      for n in monitor_data for sset in monitor_data[n]):
+        if unevaluated == 0:
             logging.info("DONE.")
             break
-        time.sleep(30)
+
+        # Poll sooner while tasks are moving, and back off while nothing is
+        if updates:
+            delay = min_interval
+        else:
+            delay = min(max_interval, delay * POLL_BACKOFF)
+        time.sleep(delay)
@@ -6,38 +6,74 @@ import logging
 import sys
 import os
 from getpass import getuser
-import nose
 import json
-from firecloud.fiss import main as fiss_func
-from firecloud.fiss import main_as_cli as fiss_cli
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from firecloud import fccore
 from firecloud import api as fapi
 from firecloud.errors import *
 
-if sys.version_info > (3,):
-    from io import StringIO
-else:
-    from StringIO import StringIO
+# firecloud.fiss (and google.cloud.storage with it) is only imported once a
+# test calls it, so collecting the tests stays quick
 
 def call_func(*args):
     # Call HL API as Python function, returning objects.  Most tests use this
     # approach, but some use call_cli to ensure that use case is also exercised
+    from firecloud.fiss import main as fiss_func
     return fiss_func(["fissfc"] + list(args))
 
 def call_cli(*args):
     # Call HL level API as from UNIX CLI,  prints to stdout & returns int status
+    from firecloud.fiss import main_as_cli as fiss_cli
     return fiss_cli(["fissfc"] + list(args))
 
+# Where a test checks a command both as a function and from the CLI, the CLI
+# half may be skipped for a quicker run by setting FISS_EXERCISE_CLI=0
+EXERCISE_CLI = os.environ.get("FISS_EXERCISE_CLI", "1") != "0"
+
 class Capturing(list):
+    # Collect the lines printed to stdout within a with block. Stands in for
+    # stdout itself, adding each line as it is completed
     def __enter__(self):
+        self._pending = ''          # Text of the line not yet completed
         self._stdout = sys.stdout
-        self._stringio = StringIO()
-        sys.stdout = self._stringio
+        sys.stdout = self
         return self
     def __exit__(self, *args):
-        self.extend(self._stringio.getvalue().splitlines())
-        del self._stringio    # free up some memory
         sys.stdout = self._stdout
+        if self._pending:
+            self.append(self._pending)
+        del self._pending, self._stdout
+    def write(self, text):
+        lines = (self._pending + text).split('\n')
+        self._pending = lines.pop()
+        self.extend(lines)
+        return len(text)
+    def flush(self):
+        pass
+
+class CountingLines(object):
+    # Count the lines printed to stdout within a with block, for outputs too
+    # long to be worth keeping; len() gives the count. Stands in for stdout
+    # itself, so nothing printed is buffered
+    def __enter__(self):
+        self._count = 0
+        self._partial = False       # Whether the last line is unterminated
+        self._stdout = sys.stdout
+        sys.stdout = self
+        return self
+    def __exit__(self, *args):
+        sys.stdout = self._stdout
+        del self._stdout
+    def write(self, text):
+        self._count += text.count('\n')
+        if text:
+            self._partial = not text.endswith('\n')
+        return len(text)
+    def flush(self):
+        pass
+    def __len__(self):
+        return self._count + self._partial
 
 class TestFISSHighLevel(unittest.TestCase):
     """ Exercise the high level interface of FISS, the (F)ireCloud (S)ervice (S)elector
@@ -60,18 +96,27 @@ class TestFISSHighLevel(unittest.TestCase):
             raise ValueError("Your configuration must define a FireCloud project")
 
         # Set up a temp workspace for duration of tests. And in case a previous
-        # test failed, we attempt to unlock & delete before creating anew
+        # test failed, we attempt to unlock & delete before creating anew.
+        # When run by pytest-xdist, each worker process gets its own space
         cls.workspace = getuser() + '_FISS_TEST'
+        if os.environ.get("PYTEST_XDIST_WORKER"):
+            cls.workspace += '_' + os.environ["PYTEST_XDIST_WORKER"]
 
-        ret = call_func("space_exists", "-p", cls.project, "-w", cls.workspace)
-        if ret and os.environ.get("REUSE_SPACE", None):
-            return
+        # Details of the space (e.g. its bucket), as returned when creating it
+        cls.space_metadata = None
 
-        print("\tCreating test workspace ...\n", file=sys.stderr)
-        r = fapi.unlock_workspace(cls.project, cls.workspace)
-        r = fapi.delete_workspace(cls.project, cls.workspace)
-        r = fapi.create_workspace(cls.project, cls.workspace)
-        fapi._check_response_code(r, 201)
+        ret = call_func("space_exists", "-p", cls.project, "-w", cls.workspace)
+        if not (ret and os.environ.get("REUSE_SPACE", None)):
+            print("\tCreating test workspace ...\n", file=sys.stderr)
+            if ret:
+                r = fapi.unlock_workspace(cls.project, cls.workspace)
+                r = fapi.delete_workspace(cls.project, cls.workspace)
+            r = fapi.create_workspace(cls.project, cls.workspace)
+            fapi._check_response_code(r, 201)
+            cls.space_metadata = r.json()
+
+        # Most tests need the data entities, so load them once for all
+        cls.load_entities()
 
     @classmethod
     def tearDownClass(cls):
@@ -94,12 +139,13 @@ class TestFISSHighLevel(unittest.TestCase):
         result = call_func("-l", "config")
         self.assertIn("config_validate", result)
         self.assertNotIn("space_info", result)
-        with Capturing() as result:
-            status = call_cli("-l", "config")
-        self.assertEqual(0, status)
-        self.assertIn("config_get", result)
-        self.assertIn("config_acl", result)
-        self.assertNotIn("meth_exists", result)
+        if EXERCISE_CLI:
+            with Capturing() as result:
+                status = call_cli("-l", "config")
+            self.assertEqual(0, status)
+            self.assertIn("config_get", result)
+            self.assertIn("config_acl", result)
+            self.assertNotIn("meth_exists", result)
 
     def test_dash_F(self):
         result = call_func("-F", "space_info")
@@ -113,41 +159,56 @@ class TestFISSHighLevel(unittest.TestCase):
         self.assertEqual(0, ret)
 
     def test_space_lock_unlock(self):
-        args = ("-p", self.project, "-w", self.workspace)
+        # Use a space of its own, as deleting it is part of the test; this
+        # leaves the shared space, and its data, to the other tests
+        space = self.workspace + "_slu"
+
+        # Remove the space should a previous run have left it behind, and
+        # again once this test is done, even if it fails part way through
+        def remove_space():
+            fapi.unlock_workspace(self.project, space)
+            fapi.delete_workspace(self.project, space)
+        remove_space()
+        self.addCleanup(remove_space)
+
+        r = fapi.create_workspace(self.project, space)
+        fapi._check_response_code(r, 201)
+
+        args = ("-p", self.project, "-w", space)
         self.assertEqual(0, call_func('space_lock', *args))
 
         # Verify LOCKED worked, by trying to delete
-        r = fapi.delete_workspace(self.project, self.workspace)
+        r = fapi.delete_workspace(self.project, space)
         fapi._check_response_code(r, 403)
 
         self.assertEqual(0, call_func('space_unlock', *args))
 
         # Verify UNLOCKED, again by trying to delete
-        r = fapi.delete_workspace(self.project, self.workspace)
+        r = fapi.delete_workspace(self.project, space)
         fapi._check_response_code(r, [200, 202])
 
-        # Lastly, recreate space in case this test was run in series with others
-        r = fapi.create_workspace(self.project, self.workspace)
-        fapi._check_response_code(r, 201)
-
     def test_space_search(self):
-        # First retrieve information about the space
-        r = fapi.get_workspace(self.project, self.workspace)
-        fapi._check_response_code(r, 200)
-        metadata = r.json()["workspace"]
+        # First retrieve information about the space, unless it was reused
+        # and so its details were not saved on creation
+        metadata = self.space_metadata
+        if metadata is None:
+            r = fapi.get_workspace(self.project, self.workspace)
+            fapi._check_response_code(r, 200)
+            metadata = r.json()["workspace"]
         # Now use part of that info (bucket id) to find the space (name)
         result = call_func("space_search", "-b", metadata['bucketName'])
-        self.assertIn(metadata['name'], ''.join(result))
+        self.assertTrue(any(metadata['name'] in row for row in result))
         # Now search for goofy thing that should never be found
         self.assertEqual([], call_func("space_search", "-b", '__NoTTHeRe__'))
 
     def test_space_list(self):
         result = call_func("space_list")
-        self.assertIn(self.workspace, ''.join(result))
-        with Capturing() as result:
-            ret = call_cli("space_list")
-        self.assertEqual(0, ret)
-        self.assertIn(self.project + '\t' + self.workspace, result)
+        self.assertTrue(any(self.workspace in row for row in result))
+        if EXERCISE_CLI:
+            with Capturing() as result:
+                ret = call_cli("space_list")
+            self.assertEqual(0, ret)
+            self.assertIn(self.project + '\t' + self.workspace, result)
 
     def test_space_exists(self):
         ret = call_func("space_exists", "-p", self.project, "-w",self.workspace)
@@ -161,6 +222,8 @@ class TestFISSHighLevel(unittest.TestCase):
         args = ("participant_list", "-p", self.project, "-w", self.workspace)
         result = call_func(*args)
         self.assertEqual(2000, len(result))
+        # Look the long list up as a set
+        result = set(result)
         self.assertIn('P-0',   result)
         self.assertIn('P-999', result)
         self.assertIn('P-1999',result)
@@ -175,7 +238,7 @@ class TestFISSHighLevel(unittest.TestCase):
 
         result = call_func("attr_get", "-p", self.project, "-w",
                            self.workspace, "-a", name)
-        logging.debug(str(result))
+        logging.debug("%s", result)
         self.assertEqual(result[name], value)
         
         ret = call_cli("-y", "attr_rename", "-p", self.project, "-w",
@@ -184,14 +247,15 @@ class TestFISSHighLevel(unittest.TestCase):
 
         result = call_func("attr_get", "-p", self.project, "-w",
                            self.workspace, "-a", rename)
-        logging.debug(str(result))
+        logging.debug("%s", result)
         self.assertEqual(result[rename], value)
         
 
-    def load_entities(self):
+    @classmethod
+    def load_entities(cls):
         # To potentially save time, sanity check if entities already exist
-        r1 = fapi.get_entity(self.project, self.workspace, "sample_set", "SS-TP")
-        r2 = fapi.get_entity(self.project, self.workspace, "participant_set", "PARTICIP_SET_2")
+        r1 = fapi.get_entity(cls.project, cls.workspace, "sample_set", "SS-TP")
+        r2 = fapi.get_entity(cls.project, cls.workspace, "participant_set", "PARTICIP_SET_2")
         if r1.status_code == 200 and r2.status_code == 200:
             return
 
@@ -199,21 +263,29 @@ class TestFISSHighLevel(unittest.TestCase):
             raise RuntimeError("while checking for sample_set/participant_set")
 
         print("\n\tLoading data entities for tests ...", file=sys.stderr)
-        args =("entity_import", "-p", self.project, "-w", self.workspace)
+        # The largest file holds 4000 entities; upload each file in one call,
+        # rather than in the default batches of 500
+        args =("entity_import", "-p", cls.project, "-w", cls.workspace,
+               "-C", "4000")
         datapath = os.path.join("firecloud", "tests")
-        call_func(*(args + ("-f", os.path.join(datapath, "participants.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "particip_set_members.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "particip_set.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "samples.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "sset_membership.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "sset.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "pairs.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "pairset_membership.tsv"))))
-        call_func(*(args + ("-f", os.path.join(datapath, "pairset_attr.tsv"))))
+        def load(tsv):
+            return call_func(*(args + ("-f", os.path.join(datapath, tsv))))
+
+        # Each file refers only to entities loaded in earlier rounds, so the
+        # files within a round can be loaded at the same time
+        rounds = [
+            ["participants.tsv"],
+            ["particip_set_members.tsv", "samples.tsv"],
+            ["particip_set.tsv", "sset_membership.tsv", "pairs.tsv"],
+            ["sset.tsv", "pairset_membership.tsv"],
+            ["pairset_attr.tsv"]
+        ]
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            for tsvs in rounds:
+                list(executor.map(load, tsvs))
         print("\t... done loading data ...", file=sys.stderr)
     
     def test_entity_rename_delete(self):
-        self.load_entities()
         ret = call_cli("-y", "entity_rename", "-p", self.project,
                        "-w", self.workspace, "-t", "sample_set",
                        "-e", "SS-NT", "-n", "SS-NB")
@@ -234,16 +306,14 @@ class TestFISSHighLevel(unittest.TestCase):
         self.assertNotIn("SS-NB", output)
     
     def test_entity_tsv(self):
-        self.load_entities()
         
-        with Capturing() as output:
+        with CountingLines() as output:
             ret = call_cli('entity_tsv', "-p", self.project, "-w", self.workspace,
                            '-t', 'participant')
         self.assertEqual(0, ret)
         self.assertEqual(2002, len(output))
 
     def test_attr_sample_set(self):
-        self.load_entities()
         with Capturing() as output:
             ret = call_cli("attr_get", "-p", self.project, "-w", self.workspace,
                             "-t", "sample_set", "-e", "SS-TP", "-a", "set_attr_1")
@@ -267,7 +337,6 @@ class TestFISSHighLevel(unittest.TestCase):
         self.assertEqual(output, "entity:sample_set_id\tset_attr_2\nSS-TP\tValue-E")
 
     def test_attr_ren_del(self):
-        self.load_entities()
         ret = call_cli("-y", "attr_rename", "-p", self.project, "-w", self.workspace,
                    "-t", "sample_set", "-a", "set_attr_2", "-n",
                    "set_attr_3")
@@ -288,7 +357,6 @@ class TestFISSHighLevel(unittest.TestCase):
         self.assertEqual(output, "entity:sample_set_id\tset_attr_3\nSS-NT\tValue-D")
 
     def test_attr_pair(self):
-        self.load_entities()
         with Capturing() as output:
             ret = call_cli("attr_get", "-p", self.project, "-w", self.workspace,
                             "-t", "pair", "-e", "PAIR-1")
@@ -298,8 +366,9 @@ class TestFISSHighLevel(unittest.TestCase):
         logging.debug(output)
         # FIXME: sort order of of attributes is different between Python 2 & 3,
         # which we should properly address w/in internals of FISS; for now, we
-        # avoid verbatim string comparison here, in favor of sorted lists
-        self.assertEqual(sorted(output.split()),
+        # avoid verbatim string comparison here, in favor of comparing counts
+        # of each token, whatever their order
+        self.assertEqual(Counter(output.split()), Counter(
            ['P-1',
             'PAIR-1',
             'S-1-NT',
@@ -311,10 +380,9 @@ class TestFISSHighLevel(unittest.TestCase):
             'entity:pair_id',
             'pair_attr1',
             'pair_attr2',
-            'participant'])
+            'participant']))
 
     def test_attr_pair_set(self):
-        self.load_entities()
         with Capturing() as output:
             ret = call_cli("attr_get", "-p", self.project, "-w", self.workspace,
                             "-t", "pair_set", "-e", "PAIRSET-1")
@@ -322,14 +390,14 @@ class TestFISSHighLevel(unittest.TestCase):
         self.assertEqual(0, ret)
         output = '\n'.join(output)
         logging.debug(output)
-        # See FIXME comment in attr_pair for why we compare sorted lists here
-        self.assertEqual(sorted(output.split()),
+        # See FIXME comment in attr_pair for why we compare token counts here
+        self.assertEqual(Counter(output.split()), Counter(
             ['PAIRSET-1',
             'entity:pair_set_id',
             'pset_attr1',
             'pset_attr1_value1',
             'pset_attr2',
-            'pset_attr2_value1'])
+            'pset_attr2_value1']))
 
     def test_config_ops(self):
         name = 'echo'
@@ -384,12 +452,12 @@ class TestFISSHighLevel(unittest.TestCase):
 
     def test_sample_list(self):
 
-        self.load_entities()
         args = ('sample_list', '-p', self.project, '-w', self.workspace)
 
         # Sample set, by way of using default value for -t
         result = call_func(*(args + ('-e', 'SS-TP')))
         self.assertEqual(2000, len(result))
+        result = set(result)
         self.assertIn('S-0-TP',   result)
         self.assertIn('S-501-TP', result)
         self.assertIn('S-1999-TP',result)
@@ -414,6 +482,7 @@ class TestFISSHighLevel(unittest.TestCase):
         # Workspace, by way of using all defaults (no entity or type args)
         result = call_func(*args)
         self.assertEqual(4000, len(result))
+        result = set(result)
         self.assertIn('S-0-TP',    result)
         self.assertIn('S-1000-TP', result)
         self.assertIn('S-1999-TP', result)
@@ -422,7 +491,6 @@ class TestFISSHighLevel(unittest.TestCase):
 
     def test_pair_list(self):
 
-        self.load_entities()
         args = ('pair_list', '-p', self.project, '-w', self.workspace)
 
         # Workspace
@@ -450,12 +518,12 @@ class TestFISSHighLevel(unittest.TestCase):
 
     def test_participant_list(self):
 
-        self.load_entities()
         args = ('participant_list', '-p', self.project, '-w', self.workspace)
 
         # Workspace
         result = call_func(*args)
         self.assertEqual(2000, len(result))
+        result = set(result)
         self.assertIn('P-0',  result)
         self.assertIn('P-1000',  result)
         self.assertIn('P-1999', result)
@@ -474,7 +542,6 @@ class TestFISSHighLevel(unittest.TestCase):
 
     def test_set_export(self):
 
-        self.load_entities()
         args = ('-p', self.project, '-w', self.workspace)
 
         # Sample set
@@ -507,7 +574,9 @@ class TestFISSHighLevel(unittest.TestCase):
         except FireCloudServerError as e:
             self.assertEqual(e.code, 404)
 def main():
-    nose.main()
+    # Only needed when run as a script; test runners collect the tests without
+    import pytest
+    sys.exit(pytest.main([__file__] + sys.argv[1:]))
 
 if __name__ == '__main__':
     main()
@@ -2,8 +2,6 @@
 
 from __future__ import print_function
 import unittest
-import time
-import nose
 import sys
 import os
 from getpass import getuser
@@ -31,12 +29,19 @@ class TestFISSLowLevel(unittest.TestCase):
             raise ValueError("Your configuration must define a FireCloud project")
         fcconfig.set_verbosity(fiss_verbosity)
 
-        # Set up a temp workspace for duration of tests; and in case a previous
-        # test failed, attempt to unlock & delete before creating anew.  Note
-        # that bc we execute space create/delete here, their tests are NO-OPs
-        cls.workspace = getuser() + '_FISS_TEST'
-        r = fapi.unlock_workspace(cls.project, cls.workspace)
-        r = fapi.delete_workspace(cls.project, cls.workspace)
+        # Set up a temp workspace for duration of tests; and if a previous test
+        # run left one behind, unlock & delete it before creating anew.  Note
+        # that bc we execute space create/delete here, their tests are NO-OPs.
+        # The high-level tests use a space of their own, and when run by
+        # pytest-xdist each worker process gets its own space too
+        cls.workspace = getuser() + '_FISS_LL_TEST'
+        if os.environ.get("PYTEST_XDIST_WORKER"):
+            cls.workspace += '_' + os.environ["PYTEST_XDIST_WORKER"]
+        r = fapi.get_workspace(cls.project, cls.workspace,
+                               fields="workspace.name")
+        if r.status_code == 200:
+            r = fapi.unlock_workspace(cls.project, cls.workspace)
+            r = fapi.delete_workspace(cls.project, cls.workspace)
         r = fapi.create_workspace(cls.project, cls.workspace)
         fapi._check_response_code(r, 201)
 
@@ -59,7 +64,7 @@ class TestFISSLowLevel(unittest.TestCase):
 
     def test_clone_workspace(self):
         """Test clone_workspace()."""
-        temp_space = getuser() + '_FISS_TEST_CLONE'
+        temp_space = self.workspace + '_CLONE'
         r = fapi.unlock_workspace(self.project, temp_space)
         r = fapi.delete_workspace(self.project, temp_space)
         r =  fapi.clone_workspace(self.project, self.workspace,
@@ -492,7 +497,9 @@ class TestFISSLowLevel(unittest.TestCase):
         pass
 
 def main():
-    nose.main()
+    # Only needed when run as a script; test runners collect the tests without
+    import pytest
+    sys.exit(pytest.main([__file__] + sys.argv[1:]))
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,304 @@
+#! /usr/bin/env python
+
+from __future__ import print_function
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+from firecloud import api as fapi
+from firecloud import supervisor
+
+class Response(object):
+    # Stands in for the requests.Response of a FireCloud API call
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.text = str(data)
+        self._data = data
+
+    def json(self):
+        return self._data
+
+class FakeFireCloud(object):
+    # Stands in for the parts of firecloud.api used by the supervisor. Each
+    # task config runs the method of the same name, and every submission is
+    # done (and succeeded) by the time it is first polled
+    def __init__(self, configs):
+        self.configs = configs
+        self.created = []
+
+    def list_workspace_configs(self, project, workspace):
+        return Response(200, [{'name': c, 'methodRepoMethod': {
+                                   'methodNamespace': 'ns',
+                                   'methodName': c,
+                                   'methodVersion': 1}}
+                              for c in self.configs])
+
+    def list_repository_methods(self):
+        return Response(200, [{'namespace': 'ns', 'name': c,
+                               'snapshotId': 1, 'entityType': 'Workflow'}
+                              for c in self.configs])
+
+    def create_submission(self, project, workspace, namespace, config,
+                          entity, etype=None, expression=None):
+        self.created.append((config, entity))
+        submission_id = "sub%d" % len(self.created)
+        return Response(201, {'submissionId': submission_id})
+
+    def get_submission(self, project, workspace, submission_id):
+        return Response(200, {'submissionId': submission_id,
+                              'status': "Done",
+                              'workflows': [{'status': "Succeeded"}]})
+
+    _check_response_code = staticmethod(fapi._check_response_code)
+
+class Clock(object):
+    # Stands in for the time module within the supervisor, so that it does
+    # not wait between polls
+    time = staticmethod(time.time)
+
+    @staticmethod
+    def sleep(seconds):
+        pass
+
+def task(state="Not Started", **kwargs):
+    # A task record, as created by init_supervisor_data
+    record = {
+        'state'        : state,
+        'evaluated'    : False,
+        'succeeded'    : False,
+        'submissionId' : None
+    }
+    record.update(kwargs)
+    return record
+
+class TestParseDot(unittest.TestCase):
+    """Test reading workflows written in DOT."""
+
+    def test_nodes_and_edges(self):
+        nodes, edges = supervisor.parse_dot("""
+            digraph workflow {
+                prep;
+                align -> call -> report
+                prep -> align [satisfiedMode="OnComplete"]
+            }""")
+        self.assertEqual(nodes, ['prep', 'align', 'call', 'report'])
+        self.assertEqual(edges, [('align', 'call', {}),
+                                 ('call', 'report', {}),
+                                 ('prep', 'align',
+                                  {'satisfiedMode': 'OnComplete'})])
+
+    def test_quoting(self):
+        nodes, edges = supervisor.parse_dot(r"""
+            digraph "my workflow" {
+                "prep-1" -> "say \"hi\"" [satisfiedMode="Always"];
+            }""")
+        self.assertEqual(nodes, ['prep-1', 'say "hi"'])
+        self.assertEqual(edges[0][2], {'satisfiedMode': 'Always'})
+
+    def test_attributes(self):
+        nodes, edges = supervisor.parse_dot("""
+            strict digraph {
+                rankdir=LR
+                graph [label="workflow"]
+                node [shape=box]; edge [color=red]
+                a -> b [satisfiedMode=OnComplete, weight=-1.5][style=bold]
+            }""")
+        self.assertEqual(nodes, ['a', 'b'])
+        self.assertEqual(edges, [('a', 'b', {'satisfiedMode': 'OnComplete',
+                                             'weight': '-1.5',
+                                             'style': 'bold'})])
+
+    def test_comments(self):
+        nodes, edges = supervisor.parse_dot("""
+            # preprocessor output
+            digraph {
+                // a -> x
+                a -> b  /* b -> y
+                           y -> z */
+            }""")
+        self.assertEqual(nodes, ['a', 'b'])
+        self.assertEqual(len(edges), 1)
+
+    def test_subgraph(self):
+        nodes, edges = supervisor.parse_dot("""
+            digraph {
+                subgraph cluster_0 { a -> b }
+                { c }
+                b -> c
+            }""")
+        self.assertEqual(nodes, ['a', 'b', 'c'])
+        self.assertEqual(edges, [('a', 'b', {}), ('b', 'c', {})])
+
+    def test_unsupported(self):
+        for graph_data in ['digraph { prep-1 -> align }',
+                           'digraph { a:port -> b }',
+                           'digraph { a -> {b c} }',
+                           'digraph { {a b} -> c }',
+                           'digraph { a [label=<<b>A</b>>] }',
+                           'digraph { a -> b } c -> d',
+                           'digraph { a -> b',
+                           'digraph { a -> }',
+                           'digraph { a [label] }',
+                           'a -> b']:
+            self.assertRaises(ValueError, supervisor.parse_dot, graph_data)
+
+class TestPollIntervals(unittest.TestCase):
+    """Test overriding the supervisor's poll intervals."""
+
+    VARIABLES = ('FISS_SUPERVISOR_MIN_POLL', 'FISS_SUPERVISOR_MAX_POLL')
+
+    def setUp(self):
+        self.saved = dict((v, os.environ.pop(v, None)) for v in self.VARIABLES)
+
+    def tearDown(self):
+        for v, value in self.saved.items():
+            os.environ.pop(v, None)
+            if value is not None:
+                os.environ[v] = value
+
+    def intervals(self, min_poll, max_poll):
+        os.environ['FISS_SUPERVISOR_MIN_POLL'] = min_poll
+        os.environ['FISS_SUPERVISOR_MAX_POLL'] = max_poll
+        return supervisor.poll_intervals()
+
+    def test_defaults(self):
+        self.assertEqual(supervisor.poll_intervals(),
+                         (supervisor.MIN_POLL_INTERVAL,
+                          supervisor.MAX_POLL_INTERVAL))
+
+    def test_override(self):
+        self.assertEqual(self.intervals('5', '30.5'), (5, 30.5))
+
+    def test_invalid(self):
+        self.assertEqual(self.intervals('soon', ''),
+                         (supervisor.MIN_POLL_INTERVAL,
+                          supervisor.MAX_POLL_INTERVAL))
+
+    def test_clamped(self):
+        self.assertEqual(self.intervals('0', '-1'), (1, 1))
+        self.assertEqual(self.intervals('10', '5'), (10, 10))
+
+class TestSupervisorRecovery(unittest.TestCase):
+    """Test saving and restoring supervisor state. These tests run offline."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.recovery_file = os.path.join(self.tempdir, 'monitor_data.json')
+        self.monitor_data = {'A': {'ss1': task()}, 'B': {'ss1': task()}}
+        self.recovery_data = {
+            'args'         : {'sample_sets': ['ss1']},
+            'monitor_data' : self.monitor_data,
+            'dependencies' : {'A': [], 'B': [{'upstream_task': 'A'}]}
+        }
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def read_state(self, n, sset='ss1'):
+        recovered = supervisor.read_recovery_data(self.recovery_file)
+        return recovered['monitor_data'][n][sset]['state']
+
+    def test_replay_logged_updates(self):
+        supervisor.write_recovery_data(self.recovery_file, self.recovery_data)
+        self.monitor_data['A']['ss1'].update(state="Running",
+                                             submissionId="sub1")
+        supervisor.log_recovery_updates(self.recovery_file,
+                                        self.recovery_data, [('A', 'ss1')])
+        self.assertEqual(self.read_state('A'), "Running")
+
+    def test_checkpoint_removes_log(self):
+        supervisor.write_recovery_data(self.recovery_file, self.recovery_data)
+        supervisor.log_recovery_updates(self.recovery_file,
+                                        self.recovery_data, [('A', 'ss1')])
+        supervisor.write_recovery_data(self.recovery_file, self.recovery_data)
+        self.assertFalse(os.path.exists(self.recovery_file + '.wal'))
+
+    def test_truncated_log_entry(self):
+        supervisor.write_recovery_data(self.recovery_file, self.recovery_data)
+        self.monitor_data['A']['ss1']['state'] = "Running"
+        supervisor.log_recovery_updates(self.recovery_file,
+                                        self.recovery_data, [('A', 'ss1')])
+        self.monitor_data['B']['ss1']['state'] = "Running"
+        supervisor.log_recovery_updates(self.recovery_file,
+                                        self.recovery_data, [('B', 'ss1')])
+        # A crash part way through writing the last entry
+        wal = self.recovery_file + '.wal'
+        with open(wal, 'rb') as f:
+            data = f.read()
+        with open(wal, 'wb') as f:
+            f.write(data[:-10])
+        self.assertEqual(self.read_state('A'), "Running")
+        self.assertEqual(self.read_state('B'), "Not Started")
+
+    def test_stale_log_after_checkpoint(self):
+        supervisor.write_recovery_data(self.recovery_file, self.recovery_data)
+        self.monitor_data['A']['ss1'].update(state="Running",
+                                             submissionId="sub1")
+        supervisor.log_recovery_updates(self.recovery_file,
+                                        self.recovery_data, [('A', 'ss1')])
+        with open(self.recovery_file + '.wal', 'rb') as f:
+            stale_log = f.read()
+
+        self.monitor_data['A']['ss1'].update(state="Completed",
+                                             evaluated=True, succeeded=True)
+        supervisor.write_recovery_data(self.recovery_file, self.recovery_data)
+        # A crash after the new checkpoint was swapped in, but before the
+        # log was removed
+        with open(self.recovery_file + '.wal', 'wb') as f:
+            f.write(stale_log)
+
+        self.assertEqual(self.read_state('A'), "Completed")
+
+class TestSupervisorLoop(unittest.TestCase):
+    """Test the supervisor's monitor loop against a fake FireCloud."""
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.recovery_file = os.path.join(self.tempdir, 'monitor_data.json')
+        self.firecloud = FakeFireCloud(['A', 'B'])
+        # Replace only the supervisor's own references to the api and time
+        # modules, leaving the modules themselves untouched
+        supervisor.fapi = self.firecloud
+        supervisor.time = Clock
+        supervisor._cached_space_configs.cache_clear()
+        supervisor._cached_repo_methods.cache_clear()
+
+    def tearDown(self):
+        supervisor.fapi = fapi
+        supervisor.time = time
+        supervisor._cached_space_configs.cache_clear()
+        supervisor._cached_repo_methods.cache_clear()
+        shutil.rmtree(self.tempdir)
+
+    def supervise(self, monitor_data):
+        args = {'project': 'proj', 'workspace': 'space', 'namespace': 'ns',
+                'sample_sets': ['ss1']}
+        dependencies = {'A': [], 'B': [{'upstream_task': 'A',
+                                        'satisfiedMode': 'OnComplete'}]}
+        supervisor.supervise_until_complete(monitor_data, dependencies, args,
+                                            self.recovery_file)
+
+    def test_run_in_order(self):
+        monitor_data = {'A': {'ss1': task()}, 'B': {'ss1': task()}}
+        self.supervise(monitor_data)
+        self.assertEqual(self.firecloud.created, [('A', 'ss1'), ('B', 'ss1')])
+        self.assertTrue(monitor_data['B']['ss1']['succeeded'])
+
+    def test_no_resubmission_of_started_task(self):
+        # Should B already be running when A completes, as after recovery
+        # from an out of date checkpoint, it must not be submitted again
+        monitor_data = {'A': {'ss1': task("Running", submissionId="old1")},
+                        'B': {'ss1': task("Running", submissionId="old2")}}
+        self.supervise(monitor_data)
+        self.assertEqual(self.firecloud.created, [])
+        self.assertEqual(monitor_data['B']['ss1']['state'], "Completed")
+
+def main():
+    # Only needed when run as a script; test runners collect the tests without
+    import pytest
+    sys.exit(pytest.main([__file__] + sys.argv[1:]))
+
+if __name__ == '__main__':
+    main()
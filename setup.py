@@ -140,17 +140,22 @@ setup(
             # 'fiss = firecloud.fiss:main'
         ]
     },
-    test_suite = 'nose.collector',
     install_requires = [
         'google-auth>=1.6.3,!=2.1.*,!=2.2.*,!=2.3.0,!=2.3.1',
         'google-cloud-storage>=1.36.1',
-        'pydot',
         'requests[security]',
         'setuptools>=40.3.0',
         'six',
-        'nose',
+        'futures; python_version < "3"',
         'pylint>=1.9.5'
     ],
+    extras_require = {
+        'test': [
+            'pytest',
+            'pytest-timeout',
+            'pytest-xdist'
+        ]
+    },
     classifiers = [
         "Programming Language :: Python :: 2",
         "Programming Language :: Python :: 3",